@@ -51,6 +51,21 @@ SAMPLE_RATE = 16000
 RECORD_SECONDS = 5
 WHISPER_MODEL_NAME = "base"  # For local Whisper: tiny / base / small
 
+# === VAD SETTINGS ===
+VAD_MIN_RMS = 150  # Absolute floor: clips with no sustained sound above this are silence
+VAD_NOISE_PERCENTILE = 20  # Frame-RMS percentile taken as the clip's noise floor
+VAD_NOISE_MARGIN = 3.0  # Speech frames must be this many times the noise floor
+VAD_FRAME_MS = 30
+VAD_MIN_SPEECH_MS = 90  # Shorter bursts (clicks, pops) are treated as silence
+VAD_PADDING_MS = 200  # Silence kept around speech so Whisper doesn't clip words
+
+# === TRACE SETTINGS ===
+TRACE_ENABLED = os.getenv("VOICE_TRACE") == "1"  # Opt-in session capture for replay.py
+TRACE_SAMPLE_RATE = float(os.getenv("VOICE_TRACE_SAMPLE_RATE", "1.0"))  # Fraction of sessions recorded
+TRACE_MAX_BYTES = 20 * 1024 * 1024  # Per-session audio cap; later frames keep timestamps, drop audio
+TRACE_DIR_MAX_BYTES = 500 * 1024 * 1024  # No new traces once TRACE_DIR is this large
+TRACE_MAX_PENDING_BYTES = 8 * 1024 * 1024  # Audio waiting on the writer thread beyond this is dropped
+
 # === TTS SETTINGS ===
 COQUI_MODEL_NAME = "tts_models/en/ljspeech/tacotron2-DDC"  # Coqui: voice cloning, multilingual
 KOKORO_MODEL_NAME = "tts_models/en/ljspeech/vits"  # Kokoro: realistic voices
@@ -65,5 +80,6 @@ GROQ_MODEL = "llama-3.1-8b-instant"
 # === PATHS ===
 TEMP_DIR = "temp_audio"
 LOG_DIR = "logs"
+TRACE_DIR = "traces"
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
\ No newline at end of file
@@ -4,20 +4,53 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Query, WebSocket
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 import asyncio
+import base64
+import concurrent.futures
 import json
+import re
+import threading
 import tempfile
+import time
 import io
 from typing import AsyncGenerator
 import logging
 import os
 from pydub import AudioSegment
 from modules.stt import speech_to_text
-from modules.llm import gemini_response, groq_response  # Updated to include Groq
+from modules.llm import gemini_response, groq_response, gemini_stream, groq_stream  # Updated to include Groq
 from modules.tts import text_to_speech
+from modules.vad import trim_silence
+from modules.trace import TraceRecorder
 from app.config import SAMPLE_RATE, WHISPER_MODEL_NAME, GROQ_API_KEY, GEMINI_API_KEY, GEMINI_MODEL, FALLBACK_TTS
 
 router = APIRouter(prefix="/voice_agent", tags=["Voice Agent"])
 
+NO_SPEECH_REPLY = "I didn't hear anything. Please speak again."
+STREAM_QUEUE_SIZE = 32  # Max tokens/events buffered before producers wait on the consumer
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_STREAM_DONE = object()
+
+# Local Whisper and the Coqui/Kokoro models are process-wide globals that are loaded lazily
+# and are not thread-safe, so calls to them go through their own single worker. Network
+# providers (Groq STT, gTTS) run on the default thread pool, like the LLM calls.
+LOCAL_STT_MODES = {"local"}
+LOCAL_TTS_MODES = {"coqui", "kokoro"}
+STT_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt")
+TTS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+
+async def run_in(executor, fn, *args):
+    """Run blocking work off the event loop so open streams keep flowing."""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+def split_sentences(buffer: str):
+    """Split off completed sentences. Returns (sentences, remainder)."""
+    *sentences, remainder = SENTENCE_END.split(buffer)
+    return [s for s in sentences if s.strip()], remainder
+
+def audio_mime(audio_bytes: bytes) -> str:
+    """gTTS returns MP3, Coqui/Kokoro return WAV."""
+    return "audio/wav" if audio_bytes[:4] == b"RIFF" else "audio/mpeg"
+
 # Templates for HTML
 templates = Jinja2Templates(directory="templates")
 
@@ -27,35 +60,60 @@ class VoiceAgent:
         self.stt_mode = stt_mode
         self.tts_mode = tts_mode
         self.llm_mode = llm_mode
+        self.no_speech_audio = {}  # tts_mode -> cached "didn't hear anything" audio
+        self.metrics = {"turns": 0, "skipped_turns": 0, "trimmed_seconds": 0.0}
         logging.basicConfig(level=logging.INFO)
 
+    async def trim_audio(self, audio_bytes: bytes):
+        """VAD: Trim leading/trailing silence. Returns (audio_bytes or None if no speech, trimmed seconds)."""
+        try:
+            trimmed, trimmed_seconds = await asyncio.to_thread(trim_silence, audio_bytes)
+        except Exception as e:
+            logging.warning(f"Silence trimming failed, using untrimmed audio: {e}")
+            return audio_bytes, 0.0
+        logging.info(f"VAD: trimmed {trimmed_seconds:.2f}s" + ("" if trimmed else " (no speech)"))
+        return trimmed, trimmed_seconds
+
     async def process_audio_to_text(self, audio_bytes: bytes, stt_mode: str) -> str:
         """STT: Audio bytes to text."""
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
             tmp.write(audio_bytes)
             tmp_path = tmp.name
         try:
-            text = speech_to_text(tmp_path, mode=stt_mode)
+            if stt_mode in LOCAL_STT_MODES:
+                text = await run_in(STT_EXECUTOR, speech_to_text, tmp_path, stt_mode)
+            else:
+                text = await asyncio.to_thread(speech_to_text, tmp_path, stt_mode)
             logging.info(f"STT Result: {text}")
             return text if text else "[no speech]"
         finally:
             os.unlink(tmp_path)
 
-    async def generate_response(self, text: str, llm_mode: str) -> str:
-        """LLM: Text to response using Gemini or Groq."""
+    def canned_response(self, text: str):
+        """Replies that don't need the LLM, or None."""
         if not text or text == "[no speech]":
-            return "I didn't hear anything. Please speak again."
+            return NO_SPEECH_REPLY
         if "bye" in text.lower() or "exit" in text.lower():
             return "Goodbye! Have a great day."
-        prompt = f"""Answer the question concisely and clearly in English.
+        return None
+
+    def build_prompt(self, text: str) -> str:
+        return f"""Answer the question concisely and clearly in English.
 
 Question: {text}
 
 Answer:"""
+
+    async def generate_response(self, text: str, llm_mode: str) -> str:
+        """LLM: Text to response using Gemini or Groq."""
+        canned = self.canned_response(text)
+        if canned:
+            return canned
+        prompt = self.build_prompt(text)
         if llm_mode == "gemini":
-            response = gemini_response(prompt)
+            response = await asyncio.to_thread(gemini_response, prompt)
         elif llm_mode == "groq":
-            response = groq_response(prompt)
+            response = await asyncio.to_thread(groq_response, prompt)
         else:
             raise ValueError("Invalid LLM mode. Choose 'gemini' or 'groq'.")
         logging.info(f"LLM Response ({llm_mode}): {response}")
@@ -63,6 +121,12 @@ Answer:"""
 
     async def text_to_audio(self, text: str, tts_mode: str) -> bytes:
         """TTS: Text to audio bytes."""
+        if tts_mode in LOCAL_TTS_MODES:
+            return await run_in(TTS_EXECUTOR, self.synthesize, text, tts_mode)
+        return await asyncio.to_thread(self.synthesize, text, tts_mode)
+
+    def synthesize(self, text: str, tts_mode: str) -> bytes:
+        """Blocking TTS with fallback. Coqui/Kokoro modes must only run on TTS_EXECUTOR."""
         file_path = text_to_speech(text, mode=tts_mode)
         if not file_path or not os.path.exists(file_path):
             logging.warning(f"TTS failed for {tts_mode}, falling back to {FALLBACK_TTS}")
@@ -74,6 +138,128 @@ Answer:"""
         os.unlink(file_path)
         return audio_bytes
 
+    async def iterate_in_thread(self, iterator_fn, *args):
+        """Run a blocking generator in a worker thread and yield its items.
+
+        Items pass through a bounded queue, so the thread pauses when the consumer
+        falls behind, and stops at its next item once the consumer is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=0.1)
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return
+
+        def produce():
+            try:
+                for item in iterator_fn(*args):
+                    if stop.is_set():
+                        return
+                    put(item)
+            except Exception as e:
+                put(e)
+            finally:
+                if not stop.is_set():
+                    put(_STREAM_DONE)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    async def stream_response(self, text: str, llm_mode: str) -> AsyncGenerator[str, None]:
+        """LLM: Stream response tokens from Gemini or Groq as they arrive."""
+        canned = self.canned_response(text)
+        if canned:
+            yield canned
+            return
+        if llm_mode == "gemini":
+            stream_fn = gemini_stream
+        elif llm_mode == "groq":
+            stream_fn = groq_stream
+        else:
+            raise ValueError("Invalid LLM mode. Choose 'gemini' or 'groq'.")
+        async for token in self.iterate_in_thread(stream_fn, self.build_prompt(text)):
+            yield token
+
+    async def stream_sentence_audio(self, sentences: asyncio.Queue, tts_mode: str) -> AsyncGenerator[bytes, None]:
+        """TTS: Synthesize sentences from the queue in order until a None sentinel."""
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            yield await self.text_to_audio(sentence, tts_mode=tts_mode)
+
+    async def no_speech_audio_for(self, tts_mode: str) -> bytes:
+        """TTS for the no-speech reply, synthesized once per TTS mode."""
+        if tts_mode not in self.no_speech_audio:
+            self.no_speech_audio[tts_mode] = await self.text_to_audio(NO_SPEECH_REPLY, tts_mode=tts_mode)
+        return self.no_speech_audio[tts_mode]
+
+    async def no_speech_turn(self, tts_mode: str, trimmed_seconds: float, timings: dict) -> dict:
+        """Skip the LLM and reply with the cached no-speech audio."""
+        self.metrics["skipped_turns"] += 1
+        started = time.perf_counter()
+        audio_bytes = await self.no_speech_audio_for(tts_mode)
+        timings["tts"] = time.perf_counter() - started
+        return {
+            "transcription": "[no speech]",
+            "response": NO_SPEECH_REPLY,
+            "audio": audio_bytes,
+            "trimmed_seconds": trimmed_seconds,
+            "skipped": True,
+            "timings": timings
+        }
+
+    async def process_turn(self, audio_bytes: bytes, stt_mode: str, llm_mode: str, tts_mode: str, timings: dict = None) -> dict:
+        """Full turn: VAD -> STT -> LLM -> TTS. Clips that VAD or STT find silent get the cached reply.
+
+        Stage timings are filled into `timings` as each stage finishes, so callers can still
+        see them when a later stage raises.
+        """
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+        speech_bytes, trimmed_seconds = await self.trim_audio(audio_bytes)
+        timings["vad"] = time.perf_counter() - started
+        self.metrics["turns"] += 1
+        self.metrics["trimmed_seconds"] += trimmed_seconds
+        if speech_bytes is None:
+            return await self.no_speech_turn(tts_mode, trimmed_seconds, timings)
+        started = time.perf_counter()
+        text = await self.process_audio_to_text(speech_bytes, stt_mode=stt_mode)
+        timings["stt"] = time.perf_counter() - started
+        if text == "[no speech]":
+            return await self.no_speech_turn(tts_mode, trimmed_seconds, timings)
+        started = time.perf_counter()
+        response_text = await self.generate_response(text, llm_mode=llm_mode)
+        timings["llm"] = time.perf_counter() - started
+        started = time.perf_counter()
+        audio_bytes = await self.text_to_audio(response_text, tts_mode=tts_mode)
+        timings["tts"] = time.perf_counter() - started
+        return {
+            "transcription": text,
+            "response": response_text,
+            "audio": audio_bytes,
+            "trimmed_seconds": trimmed_seconds,
+            "skipped": False,
+            "timings": timings
+        }
+
 # Global agent instance
 agent = VoiceAgent(stt_mode="local", tts_mode="kokoro", llm_mode="gemini")
 
@@ -82,6 +268,11 @@ async def index(request: Request):
     """Serve HTML interface."""
     return templates.TemplateResponse("index.html", {"request": request})
 
+@router.get("/metrics")
+async def metrics():
+    """Pipeline counters: turns, turns skipped by VAD, and total seconds of silence trimmed."""
+    return JSONResponse(agent.metrics)
+
 @router.post("/upload")
 async def upload_audio(
     file: UploadFile = File(..., description="Upload audio file (WAV/MP3)"),
@@ -99,19 +290,88 @@ async def upload_audio(
     if llm_mode not in ["gemini", "groq"]:
         raise HTTPException(status_code=400, detail="Invalid LLM mode. Choose 'gemini' or 'groq'.")
     contents = await file.read()
+    recorder = TraceRecorder.open("upload_audio", stt_mode=stt_mode, tts_mode=tts_mode, llm_mode=llm_mode)
+    recorder.frame(contents)
+    timings = {}
     try:
-        text = await agent.process_audio_to_text(contents, stt_mode=stt_mode)
-        response_text = await agent.generate_response(text, llm_mode=llm_mode)
-        audio_bytes = await agent.text_to_audio(response_text, tts_mode=tts_mode)
+        result = await agent.process_turn(contents, stt_mode=stt_mode, llm_mode=llm_mode, tts_mode=tts_mode, timings=timings)
+        recorder.turn(result)
         return JSONResponse({
-            "transcription": text,
-            "response": response_text,
-            "audio": audio_bytes.hex(),
+            "transcription": result["transcription"],
+            "response": result["response"],
+            "audio": result["audio"].hex(),
+            "trimmedSeconds": result["trimmed_seconds"],
+            "skipped": result["skipped"],
             "supportMessage": {"label": "Would you like to know more?", "options": ["Record Again"]}
         })
     except Exception as e:
+        recorder.error(e, timings)
         logging.error(f"Upload processing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    finally:
+        recorder.close()
+
+@router.get("/stream")
+async def voice_stream(
+    query: str = Query(..., description="Text query"),
+    tts_mode: str = Query("kokoro", description="TTS mode: gtts, coqui, or kokoro"),
+    llm_mode: str = Query("gemini", description="LLM mode: gemini or groq")
+):
+    """Stream LLM tokens as text_chunk events, then base64 audio per sentence as it is synthesized."""
+    if tts_mode not in ["gtts", "coqui", "kokoro"]:
+        raise HTTPException(status_code=400, detail="Invalid TTS mode. Choose 'gtts', 'coqui', or 'kokoro'.")
+    if llm_mode not in ["gemini", "groq"]:
+        raise HTTPException(status_code=400, detail="Invalid LLM mode. Choose 'gemini' or 'groq'.")
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        events = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        sentences = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+        async def produce_text():
+            buffer = ""
+            async for token in agent.stream_response(query, llm_mode=llm_mode):
+                await events.put({"type": "text_chunk", "chunk": token})
+                buffer += token
+                done, buffer = split_sentences(buffer)
+                for sentence in done:
+                    await sentences.put(sentence)
+            if buffer.strip():
+                await sentences.put(buffer)
+            await sentences.put(None)
+
+        async def produce_audio():
+            async for audio_bytes in agent.stream_sentence_audio(sentences, tts_mode=tts_mode):
+                await events.put({
+                    "type": "audio",
+                    "mime": audio_mime(audio_bytes),
+                    "data": base64.b64encode(audio_bytes).decode("ascii")
+                })
+
+        async def run():
+            tasks = [asyncio.create_task(produce_text()), asyncio.create_task(produce_audio())]
+            try:
+                await asyncio.gather(*tasks)
+            except Exception as e:
+                logging.error(f"Stream error: {str(e)}")
+                await events.put({"type": "error", "message": f"Error: {str(e)}"})
+            finally:
+                for task in tasks:
+                    task.cancel()
+            await events.put(None)
+
+        runner = asyncio.create_task(run())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield f"data: {json.dumps(event)}\n\n"
+            yield f"data: {json.dumps({'supportMessage': {'label': 'Would you like to know more?', 'options': ['Record Again']}})}\n\n"
+            yield "event: done\ndata: [DONE]\n\n"
+        finally:
+            runner.cancel()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 @router.websocket("/voice-stream")
 async def voice_websocket(websocket: WebSocket, stt_mode: str = "local", tts_mode: str = "kokoro", llm_mode: str = "gemini"):
@@ -126,24 +386,32 @@ async def voice_websocket(websocket: WebSocket, stt_mode: str = "local", tts_mod
         await websocket.close(code=1008, reason="Invalid LLM mode. Choose 'gemini' or 'groq'.")
         return
     await websocket.accept()
+    recorder = TraceRecorder.open("voice_websocket", stt_mode=stt_mode, tts_mode=tts_mode, llm_mode=llm_mode)
+    timings = {}
     try:
         while True:
             data = await websocket.receive_bytes()
-            text = await agent.process_audio_to_text(data, stt_mode=stt_mode)
-            response_text = await agent.generate_response(text, llm_mode=llm_mode)
-            audio_bytes = await agent.text_to_audio(response_text, tts_mode=tts_mode)
-            await websocket.send_bytes(audio_bytes)
+            recorder.frame(data)
+            timings = {}
+            result = await agent.process_turn(data, stt_mode=stt_mode, llm_mode=llm_mode, tts_mode=tts_mode, timings=timings)
+            recorder.turn(result)
+            await websocket.send_bytes(result["audio"])
             await websocket.send_text(json.dumps({
                 "type": "complete",
-                "transcription": text,
-                "response": response_text,
+                "transcription": result["transcription"],
+                "response": result["response"],
+                "trimmedSeconds": result["trimmed_seconds"],
+                "skipped": result["skipped"],
                 "supportMessage": {"label": "Would you like to know more?", "options": ["Record Again"]}
             }))
     except WebSocketDisconnect:
         logging.info("WebSocket disconnected")
     except Exception as e:
+        recorder.error(e, timings)
         logging.error(f"WebSocket error: {str(e)}")
         await websocket.send_text(json.dumps({"type": "error", "message": f"Error: {str(e)}"}))
+    finally:
+        recorder.close()
 
 
 
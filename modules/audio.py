@@ -3,6 +3,7 @@ import sounddevice as sd
 import numpy as np
 import scipy.io.wavfile as wav
 from app.config import SAMPLE_RATE, RECORD_SECONDS, TEMP_DIR
+from modules.vad import rms_volume
 import os
 
 INPUT_WAV = os.path.join(TEMP_DIR, "input.wav")
@@ -48,7 +49,7 @@ def record_audio(device_id=None):
         )
         sd.wait()
         wav.write(INPUT_WAV, SAMPLE_RATE, audio)
-        rms = np.sqrt(np.mean(np.square(audio.astype(np.float32))))
+        rms = rms_volume(audio)
         print(f"RMS Volume: {rms:,.1f} → {'GOOD' if rms > 800 else 'LOW'}")
         return INPUT_WAV
     except Exception as e:
@@ -46,5 +46,52 @@ def groq_response(user_text):
         logging.error(f"Groq detailed error: {e}")
         return "Sorry, I couldn't process that."
 
+def gemini_stream(user_text):
+    """Yield Gemini reply text as it is generated."""
+    if not user_text.strip():
+        yield "I didn't hear anything. Please speak again."
+        return
+
+    yielded = False
+    try:
+        prompt = f"You are a helpful voice assistant. Respond naturally and concisely.\nUser: {user_text}\nAssistant:"
+        for chunk in gemini_model.generate_content(prompt, stream=True):
+            # chunk.text raises for chunks without parts (safety block, empty final chunk)
+            if chunk.parts and chunk.text:
+                yielded = True
+                yield chunk.text
+    except Exception as e:
+        print(f"Gemini Stream Error: {e}")
+        logging.error(f"Gemini stream detailed error: {e}")
+        if not yielded:
+            yield "Sorry, I couldn't process that."
+
+def groq_stream(user_text):
+    """Yield Groq reply text as it is generated."""
+    if not user_text.strip():
+        yield "I didn't hear anything. Please speak again."
+        return
+
+    yielded = False
+    try:
+        prompt = f"You are a helpful voice assistant. Respond naturally and concisely.\nUser: {user_text}\nAssistant:"
+        stream = groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=GROQ_MODEL,
+            temperature=0.7,
+            max_tokens=150,
+            stream=True
+        )
+        for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yielded = True
+                yield token
+    except Exception as e:
+        print(f"Groq Stream Error: {e}")
+        logging.error(f"Groq stream detailed error: {e}")
+        if not yielded:
+            yield "Sorry, I couldn't process that."
+
 # Default export (for backward compatibility)
 gemini_response
\ No newline at end of file
@@ -0,0 +1,184 @@
+# modules/trace.py
+import json
+import os
+import queue
+import random
+import struct
+import threading
+import time
+import uuid
+from app.config import TRACE_ENABLED, TRACE_SAMPLE_RATE, TRACE_MAX_BYTES, TRACE_DIR_MAX_BYTES, TRACE_MAX_PENDING_BYTES, TRACE_DIR
+
+# Record layout: >II (meta length, payload length) + JSON meta + raw payload
+RECORD_HEADER = struct.Struct(">II")
+
+# All trace file I/O happens on one writer thread so handlers never block on disk.
+_ops = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_pending_bytes = 0  # Frame audio queued but not yet written (guarded by _writer_lock)
+_dir_bytes = None  # Size of TRACE_DIR as tracked by the writer thread; None until first scanned
+
+def _writer_loop():
+    while True:
+        fn, args = _ops.get()
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Trace writer error: {e}")
+
+def _submit(fn, *args):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="trace-writer", daemon=True)
+            _writer.start()
+    _ops.put((fn, args))
+
+def _reserve(n):
+    """Claim room for n bytes of pending audio. False if the writer is too far behind."""
+    global _pending_bytes
+    with _writer_lock:
+        if _pending_bytes + n > TRACE_MAX_PENDING_BYTES:
+            return False
+        _pending_bytes += n
+        return True
+
+def _release(n):
+    global _pending_bytes
+    with _writer_lock:
+        _pending_bytes -= n
+
+def trace_dir_size():
+    if not os.path.isdir(TRACE_DIR):
+        return 0
+    return sum(entry.stat().st_size for entry in os.scandir(TRACE_DIR) if entry.is_file())
+
+class TraceRecorder:
+    """Append-only capture of one session: inbound audio frames, modes and per-stage timings.
+
+    Disabled recorders (tracing off, not sampled, directory over its cap, or an I/O error)
+    accept every call and write nothing, so tracing never fails a live request. Once a trace
+    reaches TRACE_MAX_BYTES, frames are still recorded with their timestamps but without audio,
+    and turn/error records keep being written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = path is not None
+        self.start = time.monotonic()
+        # Writer-thread state
+        self.file = None
+        self.bytes_written = 0
+        self.truncated = False
+        if path:
+            _submit(self._open)
+
+    @classmethod
+    def open(cls, endpoint, **modes):
+        if not TRACE_ENABLED or random.random() >= TRACE_SAMPLE_RATE:
+            return cls()
+        path = os.path.join(TRACE_DIR, f"{endpoint}_{int(time.time())}_{uuid.uuid4().hex[:8]}.trace")
+        recorder = cls(path)
+        recorder.write({"kind": "session", "endpoint": endpoint, "started_at": time.time(), **modes})
+        return recorder
+
+    def write(self, meta, payload=b""):
+        """Timestamp now and hand the record to the writer thread."""
+        if not self.enabled:
+            return
+        if payload and not _reserve(len(payload)):
+            payload = b""  # Writer is behind; keep the timestamp, drop the audio
+        meta = json.dumps({"t": round(time.monotonic() - self.start, 6), **meta}).encode("utf-8")
+        _submit(self._write, meta, payload)
+
+    def _open(self):
+        global _dir_bytes
+        try:
+            if _dir_bytes is None or _dir_bytes >= TRACE_DIR_MAX_BYTES:
+                _dir_bytes = trace_dir_size()  # Rescan when over the cap in case old traces were removed
+            if _dir_bytes >= TRACE_DIR_MAX_BYTES:
+                print(f"Trace directory over {TRACE_DIR_MAX_BYTES} bytes, not recording.")
+                return
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            self.file = open(self.path, "ab")
+        except OSError as e:
+            print(f"Trace disabled, could not open {self.path}: {e}")
+
+    def _write(self, meta, payload):
+        _release(len(payload))
+        if self.file is None:
+            return
+        try:
+            if payload and self.bytes_written + len(payload) > TRACE_MAX_BYTES:
+                if not self.truncated:
+                    self.truncated = True
+                    marker = json.dumps({"t": json.loads(meta)["t"], "kind": "truncated"}).encode("utf-8")
+                    self._append(RECORD_HEADER.pack(len(marker), 0) + marker)
+                payload = b""
+            self._append(RECORD_HEADER.pack(len(meta), len(payload)) + meta + payload)
+        except OSError as e:
+            self.disable(e)
+
+    def _append(self, record):
+        global _dir_bytes
+        self.file.write(record)
+        self.file.flush()
+        self.bytes_written += len(record)
+        _dir_bytes = (_dir_bytes or 0) + len(record)
+
+    def _close(self):
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError as e:
+            print(f"Trace close failed for {self.path}: {e}")
+        self.file = None
+
+    def disable(self, error):
+        print(f"Trace disabled after I/O error on {self.path}: {error}")
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        self.file = None
+
+    def frame(self, audio_bytes):
+        """Inbound audio, timestamped on arrival. Audio is omitted past the size caps."""
+        self.write({"kind": "frame"}, audio_bytes)
+
+    def turn(self, result):
+        """Outcome of one turn. Stores timings and sizes, not transcripts."""
+        self.write({
+            "kind": "turn",
+            "timings": result["timings"],
+            "skipped": result["skipped"],
+            "trimmed_seconds": result["trimmed_seconds"],
+            "response_chars": len(result["response"])
+        })
+
+    def error(self, exc, timings):
+        """A turn that raised, with the stage timings collected before it failed."""
+        self.write({"kind": "error", "timings": timings, "error": f"{type(exc).__name__}: {exc}"})
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.write({"kind": "end"})
+        _submit(self._close)
+        self.enabled = False
+
+def read_trace(path):
+    """Yield (meta, payload) records. Stops quietly at a partially written tail."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            meta_len, payload_len = RECORD_HEADER.unpack(header)
+            meta = f.read(meta_len)
+            payload = f.read(payload_len)
+            if len(meta) < meta_len or len(payload) < payload_len:
+                return
+            yield json.loads(meta), payload
@@ -4,6 +4,7 @@ from TTS.api import TTS
 import pygame
 import time
 import os
+import uuid
 import subprocess
 from app.config import TEMP_DIR, COQUI_MODEL_NAME, KOKORO_MODEL_NAME, FALLBACK_TTS
 
@@ -61,7 +62,7 @@ def load_kokoro_tts():
 def gtts_text_to_speech(text):
     if not text:
         return None
-    mp3_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}.mp3")
+    mp3_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.mp3")
     try:
         tts = gTTS(text, lang='en')
         tts.save(mp3_file)
@@ -74,7 +75,7 @@ def gtts_text_to_speech(text):
 def coqui_text_to_speech(text):
     if not text:
         return None
-    wav_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}.wav")
+    wav_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.wav")
     try:
         model = load_coqui_tts()
         model.tts_to_file(text=text, file_path=wav_file)
@@ -87,7 +88,7 @@ def coqui_text_to_speech(text):
 def kokoro_text_to_speech(text):
     if not text:
         return None
-    wav_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}.wav")
+    wav_file = os.path.join(TEMP_DIR, f"out_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.wav")
     try:
         model = load_kokoro_tts()
         model.tts_to_file(text=text, file_path=wav_file)
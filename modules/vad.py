@@ -0,0 +1,70 @@
+# modules/vad.py
+import io
+import numpy as np
+import scipy.io.wavfile as wav
+from pydub import AudioSegment
+from app.config import SAMPLE_RATE, VAD_MIN_RMS, VAD_NOISE_PERCENTILE, VAD_NOISE_MARGIN, VAD_FRAME_MS, VAD_MIN_SPEECH_MS, VAD_PADDING_MS
+
+def rms_volume(audio):
+    """RMS level of an int16 sample array (same scale as record_audio's check)."""
+    if audio.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(audio.astype(np.float32)))))
+
+def decode_audio(audio_bytes):
+    """Decode WAV/MP3/WebM bytes into mono int16 samples at SAMPLE_RATE."""
+    segment = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    segment = segment.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    return np.array(segment.get_array_of_samples(), dtype=np.int16)
+
+def voiced_runs(voiced, min_frames):
+    """(first, last) frame index of each run of at least min_frames consecutive voiced frames."""
+    runs, start = [], None
+    for i, is_voiced in enumerate(list(voiced) + [False]):
+        if is_voiced and start is None:
+            start = i
+        elif not is_voiced and start is not None:
+            if i - start >= min_frames:
+                runs.append((start, i - 1))
+            start = None
+    return runs
+
+def find_speech(audio, sample_rate=SAMPLE_RATE):
+    """Return (start, end) sample indices of the voiced region, or None if no speech.
+
+    The speech threshold follows the clip's noise floor, so quiet mics still pass. When there
+    is sustained sound but none of it clearly above the noise, the whole clip is returned and
+    STT decides.
+    """
+    frame_len = max(1, int(sample_rate * VAD_FRAME_MS / 1000))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return None
+    frames = audio[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    frame_rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    threshold = max(VAD_MIN_RMS, np.percentile(frame_rms, VAD_NOISE_PERCENTILE) * VAD_NOISE_MARGIN)
+    runs = voiced_runs(frame_rms > threshold, min_frames)
+    if not runs:
+        if voiced_runs(frame_rms > VAD_MIN_RMS, min_frames):
+            return 0, len(audio)
+        return None
+    pad = int(sample_rate * VAD_PADDING_MS / 1000)
+    start = max(0, runs[0][0] * frame_len - pad)
+    end = min(len(audio), (runs[-1][1] + 1) * frame_len + pad)
+    return start, end
+
+def trim_silence(audio_bytes):
+    """Trim leading/trailing silence.
+
+    Returns (wav_bytes, trimmed_seconds). wav_bytes is None when the clip has no speech.
+    """
+    audio = decode_audio(audio_bytes)
+    region = find_speech(audio)
+    if region is None:
+        return None, len(audio) / SAMPLE_RATE
+    start, end = region
+    buf = io.BytesIO()
+    wav.write(buf, SAMPLE_RATE, audio[start:end])
+    trimmed_seconds = (len(audio) - (end - start)) / SAMPLE_RATE
+    return buf.getvalue(), trimmed_seconds
@@ -0,0 +1,156 @@
+# replay.py
+"""Replay recorded session traces through the pipeline and compare stage timings.
+
+Local models (Whisper local, Coqui, Kokoro) run for real. Network providers (Groq STT,
+Gemini/Groq LLM, gTTS) are stubbed: each stub waits the stage time recorded for that
+turn and returns deterministic output, so timing differences come from this build.
+
+    python replay.py traces/voice_websocket_*.trace --speed 0 --output new.json
+    python replay.py traces/voice_websocket_*.trace --baseline old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+import wave
+from app.config import TEMP_DIR
+from modules.trace import read_trace
+import app.voice_agent.views as views
+
+STAGES = ["vad", "stt", "llm", "tts"]
+LOCAL_STT = {"local"}
+LOCAL_TTS = {"coqui", "kokoro"}
+
+# Recorded turn currently being replayed; the network stubs read their latency from it
+current_turn = {}
+
+real_speech_to_text = views.speech_to_text
+real_text_to_speech = views.text_to_speech
+
+def stub_speech_to_text(audio_file, mode="local"):
+    if mode in LOCAL_STT:
+        return real_speech_to_text(audio_file, mode=mode)
+    time.sleep(current_turn.get("timings", {}).get("stt", 0.0))
+    return "replayed question"
+
+def stub_llm_response(user_text):
+    time.sleep(current_turn.get("timings", {}).get("llm", 0.0))
+    # Same length as the recorded reply so local TTS does comparable work
+    return ("This is a replayed answer. " * 50)[:max(1, current_turn.get("response_chars", 1))]
+
+def stub_text_to_speech(text, mode="gtts"):
+    if mode in LOCAL_TTS:
+        return real_text_to_speech(text, mode=mode)
+    time.sleep(current_turn.get("timings", {}).get("tts", 0.0))
+    wav_file = os.path.join(TEMP_DIR, f"replay_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.wav")
+    with wave.open(wav_file, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x00\x00" * 1600)
+    return wav_file
+
+def install_stubs():
+    views.speech_to_text = stub_speech_to_text
+    views.gemini_response = stub_llm_response
+    views.groq_response = stub_llm_response
+    views.text_to_speech = stub_text_to_speech
+
+def load_session(path):
+    """Pair each inbound frame with the turn or error record that followed it.
+
+    Frames with neither (the call died mid-turn) are still replayed, with no recorded timings.
+    Frames whose audio was dropped at the size caps can't be replayed and are skipped.
+    """
+    session, turns, frame = {}, [], None
+    for meta, payload in read_trace(path):
+        if meta["kind"] == "session":
+            session = meta
+        elif meta["kind"] == "frame":
+            if frame is not None:
+                turns.append({"t": frame[0], "audio": frame[1], "recorded": {"timings": {}, "error": "incomplete"}})
+            frame = (meta["t"], payload)
+        elif meta["kind"] in ("turn", "error") and frame is not None:
+            turns.append({"t": frame[0], "audio": frame[1], "recorded": meta})
+            frame = None
+        elif meta["kind"] == "truncated":
+            print(f"{path}: trace hit its size cap; later frames have no audio.")
+    if frame is not None:
+        turns.append({"t": frame[0], "audio": frame[1], "recorded": {"timings": {}, "error": "incomplete"}})
+    dropped = [turn for turn in turns if not turn["audio"]]
+    if dropped:
+        print(f"{path}: skipping {len(dropped)} turn(s) recorded without audio.")
+    return session, [turn for turn in turns if turn["audio"]]
+
+async def replay_trace(path, speed):
+    global current_turn
+    session, turns = load_session(path)
+    agent = views.VoiceAgent()
+    # Live, the no-speech reply comes from a process-wide cache; warm it so skipped turns compare fairly
+    await agent.no_speech_audio_for(session.get("tts_mode", "kokoro"))
+    results = []
+    start = time.monotonic()
+    for turn in turns:
+        if speed > 0:
+            delay = turn["t"] / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        current_turn = turn["recorded"]
+        timings = {}
+        entry = {"recorded": turn["recorded"]["timings"], "replayed": timings}
+        if "error" in turn["recorded"]:
+            entry["recorded_error"] = turn["recorded"]["error"]
+        try:
+            await agent.process_turn(
+                turn["audio"],
+                stt_mode=session.get("stt_mode", "local"),
+                llm_mode=session.get("llm_mode", "gemini"),
+                tts_mode=session.get("tts_mode", "kokoro"),
+                timings=timings
+            )
+        except Exception as e:
+            print(f"{path}: turn at {turn['t']:.2f}s failed on replay: {e}")
+            entry["replayed_error"] = f"{type(e).__name__}: {e}"
+        results.append(entry)
+    return {"path": path, "session": session, "turns": results}
+
+def stage_totals(traces, key):
+    totals = {stage: 0.0 for stage in STAGES}
+    for trace in traces:
+        for turn in trace["turns"]:
+            for stage, seconds in turn[key].items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+def print_comparison(columns):
+    print(f"\n{'stage':<8}" + "".join(f"{name:>12}" for name in columns))
+    for stage in STAGES:
+        print(f"{stage:<8}" + "".join(f"{totals[stage]:>11.3f}s" for totals in columns.values()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay voice agent traces and compare stage timings.")
+    parser.add_argument("traces", nargs="+", help="Trace files recorded with VOICE_TRACE=1")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed; 1 = recorded pacing, 0 = no waiting")
+    parser.add_argument("--output", help="Write the replay report (JSON) here")
+    parser.add_argument("--baseline", help="Replay report from another build to compare against")
+    args = parser.parse_args()
+
+    install_stubs()
+    traces = [asyncio.run(replay_trace(path, args.speed)) for path in args.traces]
+    report = {"speed": args.speed, "traces": traces, "totals": stage_totals(traces, "replayed")}
+
+    columns = {"recorded": stage_totals(traces, "recorded"), "replayed": report["totals"]}
+    if args.baseline:
+        with open(args.baseline) as f:
+            columns["baseline"] = json.load(f)["totals"]
+    print_comparison(columns)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()